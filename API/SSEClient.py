@@ -3,6 +3,7 @@ import aiohttp
 from aiohttp_sse_client import client as sse_client
 import json
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import sys, os
 
@@ -31,6 +32,10 @@ class SSEClient:
         self.is_ready = False
         self.asy_session = None
         self.syn_session = requests.Session()
+        # 所有同步请求共用此会话的keep-alive连接；放大连接池，多品种并发取数时也能复用连接，避免重复TCP/TLS握手
+        adapter = HTTPAdapter(pool_connections=16, pool_maxsize=32)
+        self.syn_session.mount("https://", adapter)
+        self.syn_session.mount("http://", adapter)
         self.syn_session.headers.update({
             'license': license_key
         })
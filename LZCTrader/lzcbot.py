@@ -1,5 +1,7 @@
 import os
 import time
+import asyncio
+import inspect
 from datetime import datetime
 from LZCTrader.strategy import Strategy
 from LZCTrader.order import Order
@@ -27,9 +29,9 @@ class LZCBot:
         self.instrument = strategy.instrument
         self.broker = strategy.broker
         self.strategy = strategy
-        self.run_thread = None
         self.stop_flag = None
         self.stop_thread = None
+        self.tick_event = None
 
     def __repr__(self):
         if isinstance(self.instrument, list):
@@ -70,6 +72,32 @@ class LZCBot:
                 except Exception as e:
                     print(f"AutoTrader exception when submitting order: {e}")
 
+    async def aupdate(self, timestamp: datetime) -> None:
+        """Coroutine version of update, awaited by LZCTrader's event loop.
+
+        Strategies whose generate_signal is a coroutine function run on the
+        loop directly. Plain strategies run update in a worker thread so that
+        they cannot block the other bots.
+        """
+        if not inspect.iscoroutinefunction(self.strategy.generate_signal):
+            await asyncio.to_thread(self.update, timestamp)
+            return
+
+        try:
+            strategy_orders = await self.strategy.generate_signal(timestamp)
+        except Exception as e:
+            print(f"Error when updating strategy: {e}")
+            strategy_orders = []
+
+        if strategy_orders is not None and len(strategy_orders) > 0:
+            for order in strategy_orders:
+                if order is None:
+                    continue
+                try:
+                    await asyncio.to_thread(self.submit_order, order=order)
+                except Exception as e:
+                    print(f"AutoTrader exception when submitting order: {e}")
+
     def submit_order(self, order: Order):
         "The default order execution method."
         self.broker.place_order(order)
@@ -1,11 +1,13 @@
 import os
 import sys
 import time
+import asyncio
 import threading
 import importlib
 import importlib.util
 import pandas as pd
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from LZCTrader.tools.utilities import read_yaml, extract_letters
 from brokers.futures import Futures
@@ -48,10 +50,11 @@ class LZCTrader:
         self.strategy_timestep = None
         self.preliminary_select = None
         self.strategy_class = None
-        self.fake_time = datetime.min
+        self.tick_time = None
         self.bot_list = []
         self.fc_code = ''
         self.timer_thread = None
+        self.tick_task = None
         self.market_time_type = None
 
         self.root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
@@ -307,52 +310,84 @@ class LZCTrader:
                                              broker=self.broker)
             )
             print(f"启动bot: {instrument}")  # 调试用
-            bot.run_thread = threading.Thread(target=self.real_loop, args=(bot,))
             bot.stop_flag = threading.Event()
             bot.stop_thread = threading.Thread(target=self.start_market_status_timer, args=(stop, bot))
 
             time.sleep(0.2)
-            bot.run_thread.start()
             bot.stop_thread.start()
             self.bot_list.append(bot)
 
-        # 首先收集所有需要等待的线程
-        threads_to_wait = {bot.run_thread for bot in self.bot_list}
-
-        while threads_to_wait:
-            # 获取当前所有存活线程
-            alive_threads = set(threading.enumerate())
-            # 找出已经结束的线程
-            finished_threads = threads_to_wait - alive_threads
-
-            # 处理已结束的线程
-            for thread in finished_threads:
-                # 找到对应的bot
-                for bot in self.bot_list:
-                    if bot.run_thread is thread:
-                        if not self.across:
-                            self.broker.clear_positions(bot.instrument)
-                            time.sleep(2)
-                            print(f"Bot {bot.instrument} killed")
-                        break
-                threads_to_wait.remove(thread)
-
-            # 避免忙等待
-            if threads_to_wait:
-                time.sleep(0.1)  # 短暂休眠减少CPU占用
+        # 所有bot共用一个事件循环，某个品种等待追价时其他品种照常运行
+        asyncio.run(self.main_loop())
 
         print("EXIT SYSTEM")
         sys.exit(0)
 
-    def real_loop(
+    async def main_loop(self) -> None:
+        """Run every bot and the shared clock on one event loop until all bots stop."""
+        # 非协程的策略和券商接口在线程池中执行，每个bot至少留一个线程，与原先一个bot一个线程相当
+        asyncio.get_running_loop().set_default_executor(
+            ThreadPoolExecutor(max_workers=len(self.bot_list) + 4)
+        )
+        for bot in self.bot_list:
+            bot.tick_event = asyncio.Event()
+
+        self.tick_task = asyncio.create_task(self.tick_loop())
+        await asyncio.gather(*(self.real_loop(bot) for bot in self.bot_list))
+        self.tick_task.cancel()
+
+    async def tick_loop(self) -> None:
+        """Drive all bots on a shared clock.
+
+        Each tick, the candles requested by the running strategies are fetched
+        in one concurrent batch, then every bot is woken to run its update.
+        """
+        while any(not bot.stop_flag.is_set() for bot in self.bot_list):
+            self.tick_time = datetime.now()  # 本tick所有bot共用同一个时钟读数
+            await asyncio.to_thread(self.prime_tick)
+            for bot in self.bot_list:
+                bot.tick_event.set()
+            await asyncio.sleep(self.strategy_timestep)
+
+    def prime_tick(self) -> None:
+        # 先清空上个tick的预取数据，未被取用的旧数据不会留到本tick，与tick间隔长短无关
+        try:
+            self.broker.clear_tick_cache()
+        except Exception as e:
+            print(f"Error when clearing prefetched candles: {e}")
+
+        # 相同取数参数的品种合并为一次批量请求
+        batches = {}
+        for bot in self.bot_list:
+            candle_kwargs = bot.strategy.candle_kwargs
+            if bot.stop_flag.is_set() or not candle_kwargs:
+                continue
+            batches.setdefault(tuple(sorted(candle_kwargs.items())), []).append(bot.instrument)
+
+        for kwargs, instruments in batches.items():
+            try:
+                self.broker.prime_candles(instruments, **dict(kwargs))
+            except Exception as e:
+                print(f"Error when prefetching candles: {e}")
+
+    async def real_loop(
         self,
         bot: LZCBot
     ) -> None:
-        print(f"{bot.instrument} real_loop 启动，线程ID: {threading.get_ident()}")  # 调试用
+        print(f"{bot.instrument} real_loop 启动")  # 调试用
         while not bot.stop_flag.is_set():
-            bot.update(self.fake_time)
-            time.sleep(self.strategy_timestep)
-        print(f"{bot.instrument} real_loop 结束，线程ID: {threading.get_ident()}")  # 调试用
+            try:
+                await asyncio.wait_for(bot.tick_event.wait(), timeout=1)
+            except asyncio.TimeoutError:
+                continue
+            bot.tick_event.clear()
+            await bot.aupdate(self.tick_time)
+        print(f"{bot.instrument} real_loop 结束")  # 调试用
+
+        if not self.across:
+            await asyncio.to_thread(self.broker.clear_positions, bot.instrument)
+            await asyncio.sleep(2)
+            print(f"Bot {bot.instrument} killed")
 
     def start_market_status_timer(self, stoptime: list, bot: LZCBot):
         """Start market monitor"""
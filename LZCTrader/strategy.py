@@ -4,6 +4,10 @@ from datetime import datetime
 
 
 class Strategy(ABC):
+    # get_candles keyword arguments used by generate_signal each tick. When set,
+    # LZCTrader prefetches these candles for all bots in one batch per tick.
+    candle_kwargs: dict = None
+
     @abstractmethod
     def __init__(
         self,
@@ -23,6 +27,11 @@ class Strategy(ABC):
 
     @abstractmethod
     def generate_signal(self, timestamp: datetime):
-        """Generate trading signals based on the data supplied."""
+        """Generate trading signals based on the data supplied.
+
+        May be defined with async def, in which case LZCTrader awaits it on
+        the shared event loop; blocking broker calls should then go through
+        asyncio.to_thread.
+        """
 
 
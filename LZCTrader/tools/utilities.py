@@ -1,5 +1,23 @@
 import yaml
 import re
+from datetime import datetime, time
+
+
+# 各交易所日盘交易时段 (开盘, 收盘)
+DAY_SESSIONS = {
+    'SHFE': [(time(9, 0), time(10, 15)), (time(10, 30), time(11, 30)), (time(13, 30), time(15, 0))],
+    'DCE': [(time(9, 0), time(10, 15)), (time(10, 30), time(11, 30)), (time(13, 30), time(15, 0))],
+    'CZCE': [(time(9, 0), time(10, 15)), (time(10, 30), time(11, 30)), (time(13, 30), time(15, 0))],
+}
+NIGHT_OPEN = time(21, 0)
+# 夜盘收盘时间：各交易所默认23:00，有色金属至次日1:00，黄金白银至次日2:30
+# 注意instrument_map中的stop是bot的停止时间，比实际收盘早3分钟，不能作为收盘时间
+NIGHT_CLOSE = {'SHFE': time(23, 0), 'DCE': time(23, 0), 'CZCE': time(23, 0)}
+PRODUCT_NIGHT_CLOSE = {
+    'cu': time(1, 0), 'pb': time(1, 0), 'al': time(1, 0), 'zn': time(1, 0),
+    'sn': time(1, 0), 'ni': time(1, 0), 'ss': time(1, 0), 'ao': time(1, 0),
+    'au': time(2, 30), 'ag': time(2, 30),
+}
 
 
 def read_yaml(file_path: str) -> dict:
@@ -19,6 +37,48 @@ def read_yaml(file_path: str) -> dict:
         return yaml.safe_load(f)
 
 
+def is_market_open(instrument_type: str, instrument_config: dict, now: datetime) -> bool:
+    """Check whether an instrument is inside a trading session.
+
+    Parameters
+    ----------
+    instrument_type : str
+        The product code, e.g. 'cu' for cu2508.
+
+    instrument_config : dict
+        The instrument's entry in instrument_map.yaml.
+
+    now : datetime
+        The time to check.
+
+    Returns
+    -------
+    bool
+        True during a day session, or during the night session from 21:00
+        until the product's night close time.
+    """
+    clock = now.time()
+    weekday = now.weekday()
+
+    if instrument_config['morning'] and weekday < 5:
+        for session_open, session_close in DAY_SESSIONS.get(instrument_config['exchange'], []):
+            if session_open <= clock < session_close:
+                return True
+
+    if instrument_config['night']:
+        night_close = PRODUCT_NIGHT_CLOSE.get(instrument_type, NIGHT_CLOSE.get(instrument_config['exchange']))
+        if night_close is not None:
+            if night_close > NIGHT_OPEN:
+                return weekday < 5 and NIGHT_OPEN <= clock < night_close
+            # 跨过零点的夜盘：周一至周五21点开盘，延续到次日凌晨
+            if clock >= NIGHT_OPEN:
+                return weekday < 5
+            if clock < night_close:
+                return 1 <= weekday <= 5
+
+    return False
+
+
 def extract_letters(instrument: str):
     # 匹配连续字母直到遇到数字
     match = re.match(r'^([a-zA-Z]+)\d+', instrument)
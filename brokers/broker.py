@@ -19,9 +19,41 @@ class Broker(ABC):
             end_time: datetime = None,
             cut_yesterday: bool = True
     ) -> pd.DataFrame:
-        """Get candles for an instrument."""
+        """Get candles for an instrument, sorted by time from oldest to newest."""
         pass
 
+    def get_candles_batch(
+            self,
+            instruments: list,
+            granularity: str = None,
+            count: int = None,
+            cut_yesterday: bool = True
+    ) -> dict:
+        """Get candles for several instruments, keyed by instrument."""
+        return {
+            instrument: self.get_candles(instrument, granularity=granularity, count=count, cut_yesterday=cut_yesterday)
+            for instrument in instruments
+        }
+
+    def get_latest_bar_time(self, instrument: str, granularity: str = "1min"):
+        """Get the timestamp of the newest candle, or None if unavailable."""
+        data = self.get_candles(instrument, granularity=granularity, count=1, cut_yesterday=False)
+        if data is None or len(data) == 0:
+            return None
+        return data.index[-1]
+
+    def prime_candles(
+            self,
+            instruments: list,
+            granularity: str = None,
+            count: int = None,
+            cut_yesterday: bool = True
+    ) -> None:
+        """Prefetch candles for the coming tick. Brokers without a tick cache do nothing."""
+
+    def clear_tick_cache(self) -> None:
+        """Drop candles prefetched for the previous tick. Brokers without a tick cache do nothing."""
+
     @abstractmethod
     def relog(self):
         pass
@@ -1,9 +1,12 @@
 import os
 import time
+import asyncio
+import functools
 import threading
 import pickle
 import importlib
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
 from brokers.broker import Broker
 from LZCTrader.order import Order
@@ -28,6 +31,11 @@ class Futures(Broker):
         self.short_position = 0
         self.timer_thread = None
 
+        # 每个tick由运行器批量预取的K线，get_candles命中后取出使用
+        self._tick_cache = {}
+        self._tick_cache_lock = threading.Lock()
+        self.tick_cache_ttl = 10  # 预取数据的有效期（秒）
+
     def __repr__(self):
         return "Futures Broker Interface"
 
@@ -43,13 +51,14 @@ class Futures(Broker):
             end_time: datetime = None,
             cut_yesterday: bool = False
     ) -> pd.DataFrame:
+        """获取K线数据，返回的DataFrame按时间由远到近（升序）排列，最新一根为最后一行"""
 
         if count is not None:
+            data = self._pop_tick_cache((instrument, granularity, count, cut_yesterday))
+            if data is not None:
+                return data
 
-            response = self.api.instrument.candles(
-                instrument, granularity=granularity, count=count
-            )
-            data = self.response_to_df(response, count, granularity, cut_yesterday)
+            data = self._fetch_candles(instrument, granularity, count, cut_yesterday)
 
         else:
             # count is None
@@ -66,6 +75,108 @@ class Futures(Broker):
 
         return data
 
+    def _fetch_candles(self, instrument, granularity, count, cut_yesterday):
+        """按数目从接口取K线，不读tick缓存"""
+        response = self.api.instrument.candles(
+            instrument, granularity=granularity, count=count
+        )
+        return self.response_to_df(response, count, granularity, cut_yesterday)
+
+    async def aget_candles(
+            self,
+            instrument: str,
+            granularity: str = None,
+            count: int = None,
+            start_time: datetime = None,
+            end_time: datetime = None,
+            cut_yesterday: bool = False
+    ) -> pd.DataFrame:
+        """get_candles的异步版本。行情接口为同步请求，放到事件循环的线程池中执行，多个品种可同时等待返回"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(
+            self.get_candles, instrument, granularity=granularity, count=count,
+            start_time=start_time, end_time=end_time, cut_yesterday=cut_yesterday
+        ))
+
+    async def aget_latest_bar_time(self, instrument: str, granularity: str = "1min"):
+        """get_latest_bar_time的异步版本"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.get_latest_bar_time, instrument, granularity)
+
+    def get_candles_batch(
+            self,
+            instruments: list,
+            granularity: str = None,
+            count: int = None,
+            cut_yesterday: bool = False
+    ) -> dict:
+        """并发获取多个品种的K线，返回 {品种: DataFrame}，获取失败的品种不在结果中
+
+        总是从接口取最新数据，不读tick缓存；tick缓存只供策略取用，否则预取会把上个tick未用掉的旧数据重新放回缓存
+        """
+        if not instruments:
+            return {}
+
+        def fetch(instrument):
+            return self._fetch_candles(instrument, granularity, count, cut_yesterday)
+
+        candles = {}
+        with ThreadPoolExecutor(max_workers=len(instruments)) as pool:
+            futures = {instrument: pool.submit(fetch, instrument) for instrument in instruments}
+            for instrument, future in futures.items():
+                try:
+                    candles[instrument] = future.result()
+                except Exception as e:
+                    print(f"{instrument}: 批量获取K线失败: {e}")
+        return candles
+
+    def prime_candles(
+            self,
+            instruments: list,
+            granularity: str = None,
+            count: int = None,
+            cut_yesterday: bool = False
+    ) -> None:
+        """批量预取K线并放入tick缓存，之后同参数的get_candles直接取用，不再单独请求"""
+        candles = self.get_candles_batch(instruments, granularity=granularity, count=count, cut_yesterday=cut_yesterday)
+        stamp = time.monotonic()
+        with self._tick_cache_lock:
+            for instrument, data in candles.items():
+                self._tick_cache[(instrument, granularity, count, cut_yesterday)] = (stamp, data)
+
+    def get_latest_bar_time(self, instrument: str, granularity: str = "1min"):
+        """获取最新一根K线的时间，未取到返回None。本tick已预取过该品种时直接读缓存，不发请求"""
+        now = time.monotonic()
+        with self._tick_cache_lock:
+            for (cached_instrument, cached_granularity, _, _), (stamp, data) in self._tick_cache.items():
+                if (cached_instrument == instrument and cached_granularity == granularity
+                        and now - stamp <= self.tick_cache_ttl and len(data) > 0):
+                    return data.index[-1]
+
+        try:
+            data = self.get_candles(instrument, granularity=granularity, count=1, cut_yesterday=False)
+        except Exception as e:
+            print(f"{instrument}: 获取最新K线时间失败: {e}")
+            return None
+        if data is None or len(data) == 0:
+            return None
+        return data.index[-1]
+
+    def clear_tick_cache(self) -> None:
+        """清空tick缓存，运行器在每个tick预取前调用，上个tick的数据不会留到下个tick"""
+        with self._tick_cache_lock:
+            self._tick_cache.clear()
+
+    def _pop_tick_cache(self, key):
+        with self._tick_cache_lock:
+            entry = self._tick_cache.pop(key, None)
+        if entry is None:
+            return None
+        stamp, data = entry
+        if time.monotonic() - stamp > self.tick_cache_ttl:
+            return None
+        return data
+
     def response_to_df(self, response, count, granularity, cut_yesterday):
         """将API响应转换为Pandas DataFrame的函数。"""
         try:
@@ -115,6 +226,8 @@ class Futures(Broker):
             return pd.to_datetime(result)
 
         dataframe.index = robust_to_datetime(times)
+        if not dataframe.index.is_monotonic_increasing:
+            dataframe = dataframe.sort_index()  # 统一为由远到近排序，策略无需再自行翻转
 
         if cut_yesterday:
             hours = dataframe.index.hour
@@ -220,7 +333,7 @@ class Futures(Broker):
     def close_position(self, instrument: str = None, exchange: str = 'SHFE', direction: int = 2, offset: int = 4, volume: int = 1):
         if direction == 2:
             temp = self.get_candles(instrument, granularity="1s", count=1)
-            kong_exit_point = temp.iloc[0]['Close'] + 3
+            kong_exit_point = temp['Close'].iat[-1] + 3
             close_order = Order(
                 instrument=instrument,
                 direction=direction,
@@ -233,7 +346,7 @@ class Futures(Broker):
             )
         elif direction == 3:
             temp = self.get_candles(instrument, granularity="1s", count=1)
-            duo_exit_point = temp.iloc[0]['Close'] - 3
+            duo_exit_point = temp['Close'].iat[-1] - 3
             close_order = Order(
                 instrument=instrument,
                 direction=direction,
@@ -5,11 +5,26 @@ API数据检查工具
 专门用于检查API返回的数据是否正确
 """
 
+import os
 import time
+import asyncio
+import tempfile
+import numpy as np
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from API import Context
 from brokers.futures import Futures
+from LZCTrader.tools.utilities import read_yaml, extract_letters, is_market_open
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(ROOT_DIR, "cache")
+CACHE_TTL = 60  # 1分钟K线的缓存有效期（秒）
+STALE_THRESHOLD = timedelta(hours=1)  # 超过则认为是历史数据
+DELAY_THRESHOLD = timedelta(minutes=5)  # 超过则认为有延迟
+NEW_BAR_TIMEOUT = 5.0  # 一致性检查等待新K线的最长时间（秒）
+NEW_BAR_POLL_INITIAL = 0.1  # 首次探测新K线前的等待（秒），之后每次加倍
+
 
 class APIDataChecker:
     def __init__(self):
@@ -21,6 +36,7 @@ class APIDataChecker:
         
         self.api_context = None
         self.futures_broker = None
+        self.instrument_map = read_yaml(os.path.join(ROOT_DIR, "LZCTrader/tools/instrument_map.yaml"))
         
     def connect(self):
         """连接API"""
@@ -52,193 +68,308 @@ class APIDataChecker:
         if self.api_context:
             self.api_context.stop()
             print("API连接已断开")
+
+    def _log(self, log, message=""):
+        """输出检查信息。log为列表时先缓存，检查完成后统一打印，避免并发检查时输出交错"""
+        if log is None:
+            print(message)
+        else:
+            log.append(message)
     
-    def check_data_timestamps(self, instrument, count=10):
+    def check_data_timestamps(self, instrument, data, log=None):
         """检查数据时间戳"""
-        print(f"\n检查品种 {instrument} 的数据时间戳:")
-        print("-" * 50)
+        self._log(log, f"\n检查品种 {instrument} 的数据时间戳:")
+        self._log(log, "-" * 50)
         
         try:
-            # 获取数据
-            data = self.futures_broker.get_candles(
-                instrument=instrument,
-                granularity="1min",
-                count=count,
-                cut_yesterday=False
-            )
-            
             if data is None or len(data) == 0:
-                print("未获取到数据")
+                self._log(log, "未获取到数据")
                 return False
             
-            print(f"获取到 {len(data)} 条数据")
-            print(f"数据时间范围: {data.index[0]} 到 {data.index[-1]}")
+            self._log(log, f"获取到 {len(data)} 条数据")
+            self._log(log, f"数据时间范围: {data.index[0]} 到 {data.index[-1]}")
             
             # 检查时间戳
             current_time = datetime.now()
             latest_data_time = data.index[-1]
             earliest_data_time = data.index[0]
             
-            print(f"当前时间: {current_time}")
-            print(f"最新数据时间: {latest_data_time}")
-            print(f"最早数据时间: {earliest_data_time}")
+            self._log(log, f"当前时间: {current_time}")
+            self._log(log, f"最新数据时间: {latest_data_time}")
+            self._log(log, f"最早数据时间: {earliest_data_time}")
             
             # 计算时间差
             latest_diff = current_time - latest_data_time
             earliest_diff = current_time - earliest_data_time
             
-            print(f"最新数据时间差: {latest_diff}")
-            print(f"最早数据时间差: {earliest_diff}")
+            self._log(log, f"最新数据时间差: {latest_diff}")
+            self._log(log, f"最早数据时间差: {earliest_diff}")
             
             # 判断数据质量
-            if latest_diff.total_seconds() > 3600:  # 1小时
-                print("❌ 数据过旧 - 可能是历史数据")
+            if latest_diff > STALE_THRESHOLD:
+                self._log(log, "❌ 数据过旧 - 可能是历史数据")
                 return False
-            elif latest_diff.total_seconds() > 300:  # 5分钟
-                print("⚠️  数据较旧 - 可能有延迟")
+            elif latest_diff > DELAY_THRESHOLD:
+                self._log(log, "⚠️  数据较旧 - 可能有延迟")
             else:
-                print("✅ 数据时间正常")
+                self._log(log, "✅ 数据时间正常")
             
-            # 检查数据连续性
-            time_diffs = []
-            for i in range(1, len(data)):
-                diff = data.index[i] - data.index[i-1]
-                time_diffs.append(diff.total_seconds())
+            # 检查数据连续性（按秒取整后一次性求相邻时间差）
+            time_diffs = np.diff(data.index.values.astype('datetime64[s]').astype(np.int64))
             
-            if time_diffs:
-                avg_diff = sum(time_diffs) / len(time_diffs)
-                print(f"数据间隔: 平均 {avg_diff:.0f} 秒")
+            if len(time_diffs) > 0:
+                avg_diff = time_diffs.mean()
+                bad_diffs = np.count_nonzero(np.abs(time_diffs - 60) > 10)  # 允许10秒误差
+                self._log(log, f"数据间隔: 平均 {avg_diff:.0f} 秒，异常间隔 {bad_diffs} 处")
                 
-                if abs(avg_diff - 60) > 10:  # 允许10秒误差
-                    print("⚠️  数据间隔异常")
+                if abs(avg_diff - 60) > 10:
+                    self._log(log, "⚠️  数据间隔异常")
                 else:
-                    print("✅ 数据间隔正常")
+                    self._log(log, "✅ 数据间隔正常")
             
             return True
             
         except Exception as e:
-            print(f"检查数据时出错: {e}")
+            self._log(log, f"检查数据时出错: {e}")
             return False
     
-    def check_data_values(self, instrument, count=10):
+    def check_data_values(self, instrument, data, log=None):
         """检查数据值"""
-        print(f"\n检查品种 {instrument} 的数据值:")
-        print("-" * 50)
+        self._log(log, f"\n检查品种 {instrument} 的数据值:")
+        self._log(log, "-" * 50)
         
         try:
-            data = self.futures_broker.get_candles(
-                instrument=instrument,
-                granularity="1min",
-                count=count,
-                cut_yesterday=False
-            )
-            
             if data is None or len(data) == 0:
-                print("未获取到数据")
+                self._log(log, "未获取到数据")
                 return False
             
-            print(f"数据列: {list(data.columns)}")
-            print(f"数据形状: {data.shape}")
+            self._log(log, f"数据列: {list(data.columns)}")
+            self._log(log, f"数据形状: {data.shape}")
             
-            # 检查最新数据
-            latest = data.iloc[-1]
-            print(f"\n最新数据:")
-            print(f"  开盘价: {latest['Open']}")
-            print(f"  最高价: {latest['High']}")
-            print(f"  最低价: {latest['Low']}")
-            print(f"  收盘价: {latest['Close']}")
-            print(f"  成交量: {latest['Volume']}")
+            opens = data['Open'].to_numpy()
+            highs = data['High'].to_numpy()
+            lows = data['Low'].to_numpy()
+            closes = data['Close'].to_numpy()
+            volumes = data['Volume'].to_numpy()
             
-            # 检查数据合理性
+            # 检查最新数据
+            self._log(log, f"\n最新数据:")
+            self._log(log, f"  开盘价: {opens[-1]}")
+            self._log(log, f"  最高价: {highs[-1]}")
+            self._log(log, f"  最低价: {lows[-1]}")
+            self._log(log, f"  收盘价: {closes[-1]}")
+            self._log(log, f"  成交量: {volumes[-1]}")
+            
+            # 检查数据合理性（对所有K线整体判断，统计异常根数）
             issues = []
             
             # 检查价格合理性
-            if latest['High'] < latest['Low']:
-                issues.append("最高价小于最低价")
-            if latest['Open'] < 0 or latest['Close'] < 0:
-                issues.append("价格出现负值")
+            bad_hl = np.count_nonzero(highs < lows)
+            if bad_hl:
+                issues.append(f"最高价小于最低价: {bad_hl} 根")
+            neg_price = np.count_nonzero((opens < 0) | (closes < 0))
+            if neg_price:
+                issues.append(f"价格出现负值: {neg_price} 根")
             
             # 检查成交量合理性
-            if latest['Volume'] < 0:
-                issues.append("成交量为负值")
+            neg_vol = np.count_nonzero(volumes < 0)
+            if neg_vol:
+                issues.append(f"成交量为负值: {neg_vol} 根")
             
             # 检查价格变化
             if len(data) > 1:
-                prev_close = data.iloc[-2]['Close']
-                price_change = latest['Close'] - prev_close
-                change_pct = abs(price_change / prev_close) * 100
+                price_changes = np.diff(closes)
+                change_pcts = np.abs(price_changes / closes[:-1]) * 100
                 
-                print(f"价格变化: {price_change:.2f} ({change_pct:.2f}%)")
+                self._log(log, f"价格变化: {price_changes[-1]:.2f} ({change_pcts[-1]:.2f}%)")
                 
-                if change_pct > 10:  # 超过10%的变化
-                    issues.append(f"价格变化过大: {change_pct:.2f}%")
+                big_changes = np.count_nonzero(change_pcts > 10)  # 超过10%的变化
+                if big_changes:
+                    issues.append(f"价格变化过大: {big_changes} 根，最大 {change_pcts.max():.2f}%")
             
             if issues:
-                print("❌ 发现数据问题:")
+                self._log(log, "❌ 发现数据问题:")
                 for issue in issues:
-                    print(f"  - {issue}")
+                    self._log(log, f"  - {issue}")
                 return False
             else:
-                print("✅ 数据值正常")
+                self._log(log, "✅ 数据值正常")
                 return True
                 
         except Exception as e:
-            print(f"检查数据值时出错: {e}")
+            self._log(log, f"检查数据值时出错: {e}")
             return False
     
-    def check_data_consistency(self, instrument, count=10):
-        """检查数据一致性"""
-        print(f"\n检查品种 {instrument} 的数据一致性:")
-        print("-" * 50)
+    def check_data_consistency(self, instrument, data1, data2, log=None):
+        """检查数据一致性，data1/data2为间隔一段时间先后取得的两次数据"""
+        self._log(log, f"\n检查品种 {instrument} 的数据一致性:")
+        self._log(log, "-" * 50)
         
         try:
-            # 连续获取两次数据
-            data1 = self.futures_broker.get_candles(
-                instrument=instrument,
-                granularity="1min",
-                count=count,
-                cut_yesterday=False
-            )
-            
-            time.sleep(2)  # 等待2秒
-            
-            data2 = self.futures_broker.get_candles(
-                instrument=instrument,
-                granularity="1min",
-                count=count,
-                cut_yesterday=False
-            )
-            
             if data1 is None or data2 is None:
-                print("获取数据失败")
+                self._log(log, "获取数据失败")
                 return False
             
-            print(f"第一次获取: {len(data1)} 条数据")
-            print(f"第二次获取: {len(data2)} 条数据")
+            self._log(log, f"第一次获取: {len(data1)} 条数据")
+            self._log(log, f"第二次获取: {len(data2)} 条数据")
             
             # 检查时间戳是否更新
             if data1.index[-1] == data2.index[-1]:
-                print("❌ 数据时间戳没有更新")
+                self._log(log, "❌ 数据时间戳没有更新")
                 return False
             else:
-                print("✅ 数据时间戳已更新")
-                print(f"  第一次最新时间: {data1.index[-1]}")
-                print(f"  第二次最新时间: {data2.index[-1]}")
+                self._log(log, "✅ 数据时间戳已更新")
+                self._log(log, f"  第一次最新时间: {data1.index[-1]}")
+                self._log(log, f"  第二次最新时间: {data2.index[-1]}")
             
             # 检查价格是否变化
             if data1.iloc[-1]['Close'] == data2.iloc[-1]['Close']:
-                print("⚠️  最新价格没有变化")
+                self._log(log, "⚠️  最新价格没有变化")
             else:
-                print("✅ 价格有变化")
-                print(f"  第一次价格: {data1.iloc[-1]['Close']}")
-                print(f"  第二次价格: {data2.iloc[-1]['Close']}")
+                self._log(log, "✅ 价格有变化")
+                self._log(log, f"  第一次价格: {data1.iloc[-1]['Close']}")
+                self._log(log, f"  第二次价格: {data2.iloc[-1]['Close']}")
             
             return True
             
         except Exception as e:
-            print(f"检查数据一致性时出错: {e}")
+            self._log(log, f"检查数据一致性时出错: {e}")
             return False
     
+    def _cache_path(self, key):
+        instrument, granularity, count = key
+        return os.path.join(CACHE_DIR, f"{instrument}_{granularity}_{count}.pkl")
+
+    def _cache_get(self, key):
+        """读取未过期的K线缓存，以文件修改时间判断新鲜度；未命中返回None"""
+        path = self._cache_path(key)
+        try:
+            if time.time() - os.path.getmtime(path) < CACHE_TTL:
+                return pd.read_pickle(path)
+        except Exception:  # 文件不存在、损坏或被截断时都按未命中处理，重新取数
+            pass
+        return None
+
+    def _cache_put(self, key, df, log=None):
+        """写入K线缓存：先写临时文件再替换，中断或并发运行时不会留下半截文件；写入失败只记录日志"""
+        tmp_path = None
+        try:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=CACHE_DIR, suffix=".tmp")
+            os.close(fd)
+            df.to_pickle(tmp_path)
+            os.replace(tmp_path, self._cache_path(key))
+        except Exception as e:
+            self._log(log, f"写入缓存时出错: {e}")
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+
+    async def _fetch(self, instrument, count, log, use_cache=True):
+        """取一次1分钟K线，出错时记录日志并返回None
+
+        use_cache为True时优先使用60秒内的磁盘缓存；为False时强制从接口获取，并刷新缓存
+        """
+        key = (instrument, "1min", count)
+        if use_cache:
+            data = self._cache_get(key)
+            if os.environ.get("DEV"):
+                self._log(log, f"[cache] {instrument}: {'HIT' if data is not None else 'MISS'}")
+            if data is not None:
+                return data
+
+        try:
+            data = await self.futures_broker.aget_candles(
+                instrument=instrument,
+                granularity="1min",
+                count=count,
+                cut_yesterday=False
+            )
+        except Exception as e:
+            self._log(log, f"获取数据时出错: {e}")
+            return None
+
+        if data is not None and len(data) > 0:
+            self._cache_put(key, data, log)
+        return data
+
+    async def _wait_new_bar(self, instrument, last_bar_time):
+        """等待该品种出现比last_bar_time更新的K线，出现即返回True，超时返回False
+
+        检查工具没有预取数据，每次探测都是一次接口请求，因此探测间隔从NEW_BAR_POLL_INITIAL起指数增长，
+        NEW_BAR_TIMEOUT内最多探测约6次
+        """
+        deadline = time.monotonic() + NEW_BAR_TIMEOUT
+        delay = NEW_BAR_POLL_INITIAL
+        while True:
+            await asyncio.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+            latest = await self.futures_broker.aget_latest_bar_time(instrument)
+            if latest is not None and latest > last_bar_time:
+                return True
+            if time.monotonic() >= deadline:
+                return False
+            delay *= 2
+
+    def _is_market_open(self, instrument):
+        """判断品种当前是否在交易时段内，品种不在instrument_map中时按开市处理"""
+        instrument_type = extract_letters(instrument)
+        instrument_config = self.instrument_map.get(instrument_type)
+        if instrument_config is None:
+            return True
+        return is_market_open(instrument_type, instrument_config, datetime.now())
+
+    async def _check_one(self, instrument, count=10):
+        """依次对单个品种执行三项检查，返回 (品种, 结果, 日志)"""
+        log = [f"\n{'='*20} 检查 {instrument} {'='*20}"]
+
+        data1 = await self._fetch(instrument, count, log)
+
+        market_open = self._is_market_open(instrument)
+        if market_open:
+            # 每个品种只取两次数据，三项检查共用。第二次必须从接口重新获取，否则一致性检查无意义
+            if data1 is not None and len(data1) > 0:
+                await self._wait_new_bar(instrument, data1.index[-1])  # 新K线一出现就取第二次，最多等待NEW_BAR_TIMEOUT秒
+            data2 = await self._fetch(instrument, count, log, use_cache=False)
+        else:
+            data2 = data1
+
+        # 检查时间戳（使用较新的一次数据）
+        timestamp_ok = self.check_data_timestamps(instrument, data2, log=log)
+
+        # 检查数据值
+        values_ok = self.check_data_values(instrument, data2, log=log)
+
+        # 检查一致性，休市时价格本就不会变化，跳过；开市时即使取数失败也要检查，报告获取失败
+        if not market_open:
+            log.append(f"\n{instrument}: 休市中，跳过一致性检查")
+            consistency_ok = None
+        else:
+            consistency_ok = self.check_data_consistency(instrument, data1, data2, log=log)
+
+        # 汇总结果
+        results = {
+            'timestamp': timestamp_ok,
+            'values': values_ok,
+            'consistency': consistency_ok,
+            'overall': timestamp_ok and values_ok and consistency_ok is not False
+        }
+
+        log.append(f"\n{instrument} 检查结果:")
+        log.append(f"  时间戳: {'✅' if timestamp_ok else '❌'}")
+        log.append(f"  数据值: {'✅' if values_ok else '❌'}")
+        log.append(f"  一致性: {'⏭️  休市跳过' if consistency_ok is None else '✅' if consistency_ok else '❌'}")
+        log.append(f"  总体: {'✅' if results['overall'] else '❌'}")
+
+        return instrument, results, log
+
+    async def _run_async(self, instruments):
+        """在一个事件循环中同时检查所有品种，按instruments顺序返回各品种的 (品种, 结果, 日志)"""
+        # 同步请求在线程池中执行，线程数与品种数相同，保证所有品种的请求能同时发出
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=max(1, len(instruments))))
+        return await asyncio.gather(*[self._check_one(instrument) for instrument in instruments])
+
     def run_full_check(self, instruments=None):
         """运行完整检查"""
         if instruments is None:
@@ -254,34 +385,11 @@ class APIDataChecker:
         
         try:
             results = {}
-            
-            for instrument in instruments:
-                print(f"\n{'='*20} 检查 {instrument} {'='*20}")
-                
-                # 检查时间戳
-                timestamp_ok = self.check_data_timestamps(instrument)
-                
-                # 检查数据值
-                values_ok = self.check_data_values(instrument)
-                
-                # 检查一致性
-                consistency_ok = self.check_data_consistency(instrument)
-                
-                # 汇总结果
-                results[instrument] = {
-                    'timestamp': timestamp_ok,
-                    'values': values_ok,
-                    'consistency': consistency_ok,
-                    'overall': timestamp_ok and values_ok and consistency_ok
-                }
-                
-                print(f"\n{instrument} 检查结果:")
-                print(f"  时间戳: {'✅' if timestamp_ok else '❌'}")
-                print(f"  数据值: {'✅' if values_ok else '❌'}")
-                print(f"  一致性: {'✅' if consistency_ok else '❌'}")
-                print(f"  总体: {'✅' if results[instrument]['overall'] else '❌'}")
-                
-                time.sleep(1)  # 避免请求过于频繁
+
+            # 各品种的检查都在等待网络返回，并发执行，总耗时不再随品种数线性增长
+            for instrument, result, log in asyncio.run(self._run_async(instruments)):
+                results[instrument] = result
+                print("\n".join(log))
             
             # 输出总结
             print(f"\n{'='*60}")
@@ -307,7 +415,8 @@ def main():
     
     # 或者单独检查某个品种
     # checker.connect()
-    # checker.check_data_timestamps('ag2508')
+    # data = checker.futures_broker.get_candles('ag2508', granularity="1min", count=10)
+    # checker.check_data_timestamps('ag2508', data)
     # checker.disconnect()
 
 if __name__ == "__main__":
@@ -0,0 +1,146 @@
+"""TrendFollow 策略的数值计算内核
+
+回测时需要对整段历史K线逐根判断拐点，此处用 numba 编译成机器码一次扫描完成。
+未安装 numba 时退化为普通 Python 函数，结果相同，只是速度较慢。
+"""
+
+import numpy as np
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+
+@njit(cache=True)
+def pivot_direction(price, window_high, window_low):
+    """价格突破窗口最高价（允许0.1%误差）返回2，跌破窗口最低价返回3，否则返回0"""
+    if price >= window_high or price > window_high * 0.999:
+        return 2
+    if price <= window_low or price < window_low * 1.001:
+        return 3
+    return 0
+
+
+@njit(cache=True)
+def dynamic_volume(trade_num, current_volume, window_volume_mean):
+    """信号强度法动态仓位：基础手数*成交量/均值，最少1手，最多5手"""
+    strength = current_volume / window_volume_mean if window_volume_mean > 0 else 1.0
+    return min(max(int(trade_num * strength), 1), 5)
+
+
+@njit(cache=True)
+def tf_core(closes, highs, lows, volumes, latest, window_size, volume_threshold, trade_num,
+            long_position, short_position, last_entry_price, take_profit, stop_loss):
+    """实盘单个tick的数值计算：窗口统计、动态手数、拐点方向与止盈止损判断
+
+    last_entry_price无开仓记录时传NaN。返回 (拐点方向0/2/3, 动态手数, 窗口最高价, 窗口最低价,
+    窗口平均成交量, 止盈止损平仓方向)，拐点方向已包含放量确认，不含最小间隔判断；
+    平仓方向3为平多(卖)、2为平空(买)、0为无需平仓，多空同时满足时先平多
+    """
+    start = latest - window_size
+    window_high = highs[start:latest + 1].max()
+    window_low = lows[start:latest + 1].min()
+    window_volume_mean = volumes[start:latest + 1].mean()
+    price = closes[latest]
+    volume = volumes[latest]
+
+    signal = 0
+    if volume > window_volume_mean * volume_threshold:
+        signal = pivot_direction(price, window_high, window_low)
+
+    exit_direction = 0
+    for held, side, direction in ((long_position, 1.0, 3), (short_position, -1.0, 2)):
+        profit = (price - last_entry_price) * side
+        if exit_direction == 0 and held > 0 and (profit >= take_profit or profit <= -stop_loss):
+            exit_direction = direction
+
+    return (signal, dynamic_volume(trade_num, volume, window_volume_mean), window_high, window_low,
+            window_volume_mean, exit_direction)
+
+
+@njit(cache=True)
+def scan_pivots(highs, lows, closes, volumes, times, window_size, volume_threshold, min_interval_sec):
+    """扫描所有K线，返回拐点信号的 (位置数组, 方向数组)，方向2为上拐点(做多)，3为下拐点(做空)
+
+    与实盘逻辑一致：窗口为当前K线及其之前的window_size根；times为各K线的秒级时间戳，
+    相邻两个信号的时间间隔不小于min_interval_sec
+    """
+    n = closes.shape[0]
+    out_idx = np.empty(n, np.int64)
+    out_dir = np.empty(n, np.int8)
+    k = 0
+    last_time = 0
+    has_last = False
+    for i in range(window_size, n):
+        window_high = highs[i - window_size:i + 1].max()
+        window_low = lows[i - window_size:i + 1].min()
+        window_volume_mean = volumes[i - window_size:i + 1].mean()
+        if volumes[i] <= window_volume_mean * volume_threshold:
+            continue
+        if has_last and times[i] - last_time < min_interval_sec:
+            continue
+        direction = pivot_direction(closes[i], window_high, window_low)
+        if direction == 0:
+            continue
+        out_idx[k] = i
+        out_dir[k] = direction
+        k += 1
+        last_time = times[i]
+        has_last = True
+    return out_idx[:k], out_dir[:k]
+
+
+def scan_pivots_vectorized(closes, volumes, times, window_highs, window_lows, window_volume_means,
+                           volume_threshold, min_interval_sec):
+    """scan_pivots的纯numpy版本，供未安装numba时使用
+
+    window_*为min_generate_features算出的整列窗口统计(历史不足处为NaN)，先用数组比较一次得出全部候选拐点，
+    只对候选K线逐个做最小间隔筛选
+    """
+    surge = volumes > window_volume_means * volume_threshold
+    up = surge & ((closes >= window_highs) | (closes > window_highs * 0.999))
+    down = surge & ~up & ((closes <= window_lows) | (closes < window_lows * 1.001))
+    candidates = np.flatnonzero(up | down)
+
+    keep = []
+    last_time = None
+    for i in candidates:
+        if last_time is not None and times[i] - last_time < min_interval_sec:
+            continue
+        keep.append(i)
+        last_time = times[i]
+    out_idx = np.array(keep, dtype=np.int64)
+    return out_idx, np.where(up[out_idx], 2, 3).astype(np.int8)
+
+
+@njit(cache=True)
+def rolling_max(values, window):
+    """单调队列法滑动窗口最大值，O(n)；窗口为当前及之前共window个元素，前window-1个为NaN"""
+    n = values.shape[0]
+    out = np.full(n, np.nan)
+    queue = np.empty(n, np.int64)  # 窗口内候选最大值的下标，对应的值单调递减
+    head = 0
+    tail = 0
+    for i in range(n):
+        while tail > head and values[queue[tail - 1]] <= values[i]:
+            tail -= 1
+        queue[tail] = i
+        tail += 1
+        if queue[head] <= i - window:
+            head += 1
+        if i >= window - 1:
+            out[i] = values[queue[head]]
+    return out
+
+
+@njit(cache=True)
+def rolling_min(values, window):
+    """单调队列法滑动窗口最小值，见rolling_max"""
+    return -rolling_max(-values, window)
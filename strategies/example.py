@@ -42,7 +42,7 @@ class Example(Strategy):
         # granularity：时间粒度，支持1s，5s，1min，1h等；
         # count：取k线的数目；
         # cut_yesterday：取的数据中，当同时包含今日数据和昨日数据时，是否去掉昨日数据。True表示去掉；
-        data = data[::-1]  # 取到的数据中，按时间由近到远排序。再此翻转为由远到近，便于某些策略处理
+        # 取到的数据按时间由远到近排序，最新一根K线为最后一行
 
         position_dict = self.broker.get_position(self.instrument)
         print(f"{self.instrument} position", position_dict["long_tdPosition"], position_dict["long_ydPosition"], position_dict["short_tdPosition"], position_dict["short_ydPosition"]) # 仓位查询
@@ -50,7 +50,7 @@ class Example(Strategy):
         some_condition = True  # 由取到的data计算，得到某些condition，作为策略下单条件
 
         temp = self.broker.get_candles(self.instrument, granularity="1s", count=1)
-        current_point = temp.iloc[0]['Close']  # 取最近一根秒级k线，作为当前价格
+        current_point = temp['Close'].iat[-1]  # 取最近一根秒级k线，作为当前价格
 
         if some_condition:
             self.broker.relog()  # 由于一段时间不登录，交易所可能会自动下线，所以每次下单前先登录
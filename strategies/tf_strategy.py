@@ -1,11 +1,89 @@
-import time
+import os
+import queue
+import atexit
+import asyncio
+import logging
+import functools
 import threading
 import pandas as pd
 import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 from datetime import datetime
 from LZCTrader.strategy import Strategy
 from brokers.broker import Broker
 from LZCTrader.order import Order
+from strategies._tf_kernels import (NUMBA_AVAILABLE, dynamic_volume, tf_core, scan_pivots, scan_pivots_vectorized,
+                                    rolling_max, rolling_min)
+
+_STALE_THRESHOLD_NS = 3600 * 10 ** 9  # 数据过旧阈值：1小时（纳秒）
+
+# 日志级别由环境变量TF_LOG控制（TRACE/DEBUG/INFO/WARNING/ERROR），默认INFO只输出信号与下单信息
+# 只配置本策略的logger，不改动root logger，避免numba、urllib3等第三方库的调试输出一并打开
+TRACE = 5
+logging.addLevelName(TRACE, "TRACE")
+_LOG_LEVELS = {"TRACE": TRACE, "DEBUG": logging.DEBUG, "INFO": logging.INFO,
+               "WARNING": logging.WARNING, "ERROR": logging.ERROR}
+logger = logging.getLogger("strategies.tf")
+if not logger.handlers:  # 策略模块可能被重复加载，避免重复添加handler
+    _handler = logging.StreamHandler()
+    _handler.setFormatter(logging.Formatter("%(levelname)s:%(name)s:%(message)s"))
+    logger.addHandler(_handler)
+logger.propagate = False
+_tf_log = os.environ.get("TF_LOG", "INFO").upper()
+logger.setLevel(_LOG_LEVELS.get(_tf_log, logging.INFO))
+if _tf_log not in _LOG_LEVELS:
+    logger.warning("无效的TF_LOG取值 %r，可选 %s，已使用INFO", _tf_log, "/".join(_LOG_LEVELS))
+
+_DEQUE_MIN_BARS = 1000  # K线数超过此值且已安装numba时，窗口最高/最低价改用单调队列算法
+
+# 下单记录由后台线程写入，交易线程只需入队，不必等待磁盘；所有品种共用一个文件句柄
+_ORDER_BOOK_PATH = "result/order_book.txt"
+_ORDER_WRITER_STOP = object()  # 哨兵，收到后写入线程写完已入队的记录并退出
+_order_queue = queue.Queue()
+_order_writer = None
+_order_writer_lock = threading.Lock()
+
+
+def _order_writer_loop():
+    f = None
+    try:
+        while True:
+            line = _order_queue.get()
+            if line is _ORDER_WRITER_STOP:
+                return
+            try:
+                if f is None:
+                    os.makedirs(os.path.dirname(_ORDER_BOOK_PATH), exist_ok=True)
+                    f = open(_ORDER_BOOK_PATH, "a", encoding="utf-8", buffering=1)  # 行缓冲，每条记录即时落盘
+                f.write(line)
+            except OSError as e:
+                # 写入失败不退出线程，记录丢失内容，下一条记录时重新打开文件
+                logger.error("写入下单记录失败: %s，未写入的记录: %s", e, line.strip())
+                if f is not None:
+                    try:
+                        f.close()
+                    except OSError:
+                        pass
+                    f = None
+    finally:
+        if f is not None:
+            f.close()
+
+
+def _stop_order_writer():
+    """进程退出前通知写入线程，等待已入队的下单记录写完"""
+    _order_queue.put(_ORDER_WRITER_STOP)
+    _order_writer.join(timeout=10)
+
+
+def _ensure_order_writer():
+    """首次创建策略时启动下单记录写入线程"""
+    global _order_writer
+    with _order_writer_lock:
+        if _order_writer is None:
+            _order_writer = threading.Thread(target=_order_writer_loop, name="order-book-writer", daemon=True)
+            _order_writer.start()
+            atexit.register(_stop_order_writer)
 
 
 class TrendFollow(Strategy):
@@ -35,7 +113,8 @@ class TrendFollow(Strategy):
         # 自定义：
         self.trade_num = self.params.get('trade_num', 1)  # 交易手数
         self.trade_offset = self.params.get('trade_offset', 3)  # 取买几卖几
-        self.lock = threading.Lock()  # 线程锁
+        _ensure_order_writer()  # 下单记录写入线程
+        self.candle_kwargs = dict(granularity="1min", count=30, cut_yesterday=True)  # 每个tick的取数参数，运行器据此批量预取
 
         # 拐点检测参数
         self.window_size = self.params.get("window_size", 5)  # 滑动窗口大小（分钟）
@@ -47,145 +126,179 @@ class TrendFollow(Strategy):
         
         # 拐点历史记录
         self.last_signal_time = None
+        self._last_signal_epoch = None  # 上次信号时间的秒级时间戳，供最小间隔判断直接相减
         self.last_data_time = None  # 记录上次数据时间
         self.take_profit = self.params.get("take_profit", 10)  # 止盈点数
         self.stop_loss = self.params.get("stop_loss", 5)      # 止损点数
         self.last_entry_price = None  # 记录上次开仓价
         self.price_tick = self.params.get("price_tick", 1)  # 最小变动价位
 
+        # 每个tick都不变的量，预先算好
+        self._min_bars = self.window_size * 2  # 拐点检测所需的最少K线数
+        self._min_interval_sec = self.min_interval * 60  # 最小拐点间隔（秒）
+        self._fetch = functools.partial(self.broker.get_candles, self.instrument, **self.candle_kwargs)
+
+        # 创建策略时先用空数据跑一次tf_core，numba在此完成编译，首个tick不会在共享事件循环上等待编译
+        # pandas开启写时复制时to_numpy返回只读数组，numba按可写与只读分别编译，两种都预先编译
+        warm_up = np.ones(self.window_size + 1)
+        warm_up_readonly = warm_up.copy()
+        warm_up_readonly.flags.writeable = False
+        for arr in (warm_up, warm_up_readonly):
+            self._tf_core(arr, arr, arr, arr, self.window_size, 0, 0)
+
+    def _tf_core(self, closes, highs, lows, volumes, latest_index, long_position, short_position):
+        """调用tf_core，参数统一为固定类型与连续内存布局，避免配置中int/float混用或DataFrame列视图导致numba重新编译"""
+        return tf_core(
+            np.ascontiguousarray(closes), np.ascontiguousarray(highs),
+            np.ascontiguousarray(lows), np.ascontiguousarray(volumes), int(latest_index), int(self.window_size),
+            float(self.volume_threshold), int(self.trade_num), int(long_position), int(short_position),
+            float(self.last_entry_price) if self.last_entry_price is not None else np.nan,
+            float(self.take_profit), float(self.stop_loss)
+        )
+
     def min_generate_features(self, data: pd.DataFrame):
         # 在此函数中，根据传入参数data，计算出你策略所需的指标，非必需
-        # 这里可以添加技术指标计算，如MA、EMA等
-        return data
+        # 滑动窗口指标：以每根K线为窗口末端，向前取window_size根，一次性算出整列的窗口最高价、最低价和平均成交量
+        # 只用到当前及之前的数据，回测(backtest)时可直接按行读取，不会用到未来数据；前window_size根历史不足，为NaN
+        span = self.window_size + 1
+        n = len(data)
+        win_high = np.full(n, np.nan)
+        win_low = np.full(n, np.nan)
+        win_vol_mean = np.full(n, np.nan)
+        if n >= span:
+            highs = data['High'].to_numpy(dtype=np.float64)
+            lows = data['Low'].to_numpy(dtype=np.float64)
+            if NUMBA_AVAILABLE and n > _DEQUE_MIN_BARS:
+                # 长序列（如回测）用O(n)的单调队列，避免逐窗口O(window)的重复比较
+                win_high = rolling_max(highs, span)
+                win_low = rolling_min(lows, span)
+            else:
+                win_high[span - 1:] = sliding_window_view(highs, span).max(axis=1)
+                win_low[span - 1:] = sliding_window_view(lows, span).min(axis=1)
+            win_vol_mean[span - 1:] = sliding_window_view(data['Volume'].to_numpy(dtype=np.float64), span).mean(axis=1)
+
+        return data.assign(win_high=win_high, win_low=win_low, win_vol_mean=win_vol_mean)
 
-    def generate_signal(self, dt: datetime):
+    async def generate_signal(self, dt: datetime = None):
         # 此为函数主体，根据指标进行计算，产生交易信号并下单，程序只会调用这一个函数进行不断循环。必需
+        # dt：运行器在本tick读取的当前时间，各品种共用；单独调用时可不传，默认取当前时间
+
+        # 频繁读取的配置先绑定为局部变量
+        broker = self.broker
+        instrument = self.instrument
+        exchange = self.exchange
+        window_size = self.window_size
 
         new_orders = []
-        data = self.broker.get_candles(self.instrument, granularity="1min", count=30, cut_yesterday=True)  # 取行情数据函数示例
+
+        # 先用最新K线时间判断是否有新数据，没有则直接跳过，省去取K线和查持仓的请求
+        # 同一根K线内的重复tick在此返回，窗口统计每根K线只算一次，无需另行缓存
+        latest_bar_time = await asyncio.to_thread(
+            broker.get_latest_bar_time, instrument, self.candle_kwargs["granularity"]
+        )
+        if latest_bar_time is not None and latest_bar_time == self.last_data_time:
+            logger.debug("%s: 数据时间戳与上次相同，跳过拐点检测", instrument)
+            return new_orders
+
+        # 取行情数据与查询当前持仓互不依赖，同时发出请求
+        data, position_dict = await asyncio.gather(
+            asyncio.to_thread(self._fetch),  # 取行情数据，参数见candle_kwargs
+            asyncio.to_thread(broker.get_position, instrument)
+        )
         # granularity：时间粒度，支持1s，5s，1min，1h等；
         # count：取k线的数目；
         # cut_yesterday：取的数据中，当同时包含今日数据和昨日数据时，是否去掉昨日数据。True表示去掉；
-        data = data[::-1]  # 取到的数据中，按时间由近到远排序。再此翻转为由远到近，便于某些策略处理
+        # 取到的数据按时间由远到近排序，最新一根K线为最后一行
 
-        # 检查当前持仓
-        position_dict = self.broker.get_position(self.instrument)
         long_position = position_dict["long_tdPosition"] + position_dict["long_ydPosition"]
         short_position = position_dict["short_tdPosition"] + position_dict["short_ydPosition"]
-        print(f"{self.instrument} 当前多头仓位: {long_position}，空头仓位: {short_position}")
+        logger.debug("%s 当前多头仓位: %s，空头仓位: %s", instrument, long_position, short_position)
 
         # 检查数据是否足够进行拐点检测
-        if len(data) < self.window_size * 2:
-            print(f"{self.instrument}: 数据不足，跳过拐点检测")
+        if len(data) < self._min_bars:
+            logger.info("%s: 数据不足，跳过拐点检测", instrument)
             return new_orders
 
+        latest_data_time = data.index[-1]  # 最新数据时间，以下各处共用
+
         # 检查数据时间戳是否与上次相同，避免处理重复数据
-        if self.last_data_time is not None and data.index[0] == self.last_data_time:
-            print(f"{self.instrument}: 数据时间戳与上次相同，跳过拐点检测")
+        if self.last_data_time is not None and latest_data_time == self.last_data_time:
+            logger.debug("%s: 数据时间戳与上次相同，跳过拐点检测", instrument)
             return new_orders
         
         # 移除data.index相关调试输出
         
         # 检查数据时间是否合理（不能太旧）
-        current_time = datetime.now()
-        latest_data_time = data.index[0]  # 修正为最新数据时间
-        time_diff = current_time - latest_data_time
-        if time_diff.total_seconds() > 3600:  # 1小时 = 3600秒
-            print(f"{self.instrument}: 数据时间过旧 ({latest_data_time})，跳过处理")
-            print(f"{self.instrument}: 当前时间: {current_time}, 时间差: {time_diff}")
+        # 当前墙钟时间，只用于判断数据新旧；与K线时间同为本地时间，直接比较纳秒整数
+        wall_now = pd.Timestamp(dt) if dt is not None else pd.Timestamp.now()
+        if wall_now.value - latest_data_time.value > _STALE_THRESHOLD_NS:
+            logger.warning("%s: 数据时间过旧 (%s)，跳过处理", instrument, latest_data_time)
+            logger.debug("%s: 当前时间: %s, 时间差: %s", instrument, wall_now, wall_now - latest_data_time)
             
             if self.backtest_mode:
-                print(f"{self.instrument}: 回测模式 - 继续分析历史数据")
+                logger.info("%s: 回测模式 - 继续分析历史数据", instrument)
                 # 回测模式下继续处理历史数据
             else:
-                print(f"{self.instrument}: 实盘/模拟盘模式 - 跳过过期数据")
+                logger.info("%s: 实盘/模拟盘模式 - 跳过过期数据", instrument)
                 return new_orders
         
-        self.last_data_time = data.index[0]
+        self.last_data_time = latest_data_time
 
         # 检测最新数据点是否为拐点 - 修复索引逻辑
         latest_index = len(data) - 1  # 直接使用最新数据
-        if latest_index < self.window_size:
-            print(f"{self.instrument}: 最新索引小于窗口大小，跳过")
+        if latest_index < window_size:
+            logger.debug("%s: 最新索引小于窗口大小，跳过", instrument)
             return new_orders
 
-        # 获取滑动窗口数据（以最新数据为中心）
-        start_idx = max(0, latest_index - self.window_size)
-        end_idx = min(len(data), latest_index + self.window_size + 1)
-        window_data = data.iloc[start_idx:end_idx]
+        # 取出底层数组后按位置读取，避免逐个元素走pandas的索引路径
+        closes = data['Close'].to_numpy(dtype=np.float64)
+        highs = data['High'].to_numpy(dtype=np.float64)
+        lows = data['Low'].to_numpy(dtype=np.float64)
+        volumes = data['Volume'].to_numpy(dtype=np.float64)
+
+        # 窗口统计、动态手数、拐点与止盈止损判断由编译后的tf_core一次算完
+        # 滑动窗口为最新数据及其之前的window_size根K线；信号强度法动态仓位
+        (signal, lots, window_high, window_low, window_volume_mean,
+         exit_direction) = self._tf_core(closes, highs, lows, volumes, latest_index, long_position, short_position)
         
-        current_price = data.iloc[latest_index]['Close']
-        current_volume = data.iloc[latest_index]['Volume']
-        window_high = window_data['High'].max()
-        window_low = window_data['Low'].min()
-        window_volume_mean = window_data['Volume'].mean()
-        current_time = data.index[latest_index]
+        current_price = closes[latest_index]
+        current_volume = volumes[latest_index]
+        bar_time = latest_data_time  # 信号所在K线时间，用于最小间隔判断与记录
 
         # 添加调试输出
-        print(f"{self.instrument}: 价格={current_price:.2f}, 成交量={current_volume:.0f}")
-        print(f"{self.instrument}: 窗口最高={window_high:.2f}, 最低={window_low:.2f}, 平均成交量={window_volume_mean:.0f}")
-
-        # 信号强度法动态仓位
-        dynamic_volume = self.get_dynamic_volume(current_volume, window_volume_mean)
-        print(f"{self.instrument}: 动态下单手数={dynamic_volume}")
-
-        # 检测上拐点（局部高点）或价格突破
-        price_breakout = current_price > window_high * 0.999  # 允许0.1%的误差
-        volume_surge = current_volume > window_volume_mean * self.volume_threshold
-        
-        # 检查当前持仓
-        position_dict = self.broker.get_position(self.instrument)
-        long_position = position_dict["long_tdPosition"] + position_dict["long_ydPosition"]
-        short_position = position_dict["short_tdPosition"] + position_dict["short_ydPosition"]
-        print(f"{self.instrument} 当前多头仓位: {long_position}，空头仓位: {short_position}")
+        logger.debug("%s: 价格=%.2f, 成交量=%.0f", instrument, current_price, current_volume)
+        logger.debug("%s: 窗口最高=%.2f, 最低=%.2f, 平均成交量=%.0f",
+                     instrument, window_high, window_low, window_volume_mean)
+        logger.debug("%s: 动态下单手数=%s", instrument, lots)
 
         # ===== 止盈止损平仓逻辑 =====
-        # 多头平仓
-        if long_position > 0 and self.last_entry_price is not None:
-            profit = current_price - self.last_entry_price
-            if profit >= self.take_profit or profit <= -self.stop_loss:
-                print(f"{self.instrument}: 多头平仓，盈利/亏损点数: {profit}")
-                close_long_proto = Order(
-                    instrument=self.instrument,
-                    exchange=self.exchange,
-                    direction=3,  # 卖
-                    offset=4,     # 平今
-                    price=current_price - 1,
-                    volume=long_position,
-                    stopPrice=0,
-                    orderPriceType=1
-                )
-                self.place_with_retry(close_long_proto, direction=3)
-                self.last_entry_price = None
-        # 空头平仓
-        if short_position > 0 and self.last_entry_price is not None:
-            profit = self.last_entry_price - current_price
-            if profit >= self.take_profit or profit <= -self.stop_loss:
-                print(f"{self.instrument}: 空头平仓，盈利/亏损点数: {profit}")
-                close_short_proto = Order(
-                    instrument=self.instrument,
-                    exchange=self.exchange,
-                    direction=2,  # 买
-                    offset=4,     # 平今
-                    price=current_price + 1,
-                    volume=short_position,
-                    stopPrice=0,
-                    orderPriceType=1
-                )
-                self.place_with_retry(close_short_proto, direction=2)
-                self.last_entry_price = None
+        # exit_direction为3平多(卖，低1点挂单)，为2平空(买，高1点挂单)
+        if exit_direction and self.last_entry_price is not None:
+            side = 1 if exit_direction == 3 else -1
+            logger.info("%s: %s平仓，盈利/亏损点数: %s", instrument, "多头" if side > 0 else "空头",
+                        (current_price - self.last_entry_price) * side)
+            exit_proto = Order(
+                instrument=instrument,
+                exchange=exchange,
+                direction=exit_direction,
+                offset=4,     # 平今
+                price=current_price - side,
+                volume=long_position if side > 0 else short_position,
+                stopPrice=0,
+                orderPriceType=1
+            )
+            await self.place_with_retry(exit_proto, direction=exit_direction)
+            self.last_entry_price = None
         # ===== 止盈止损平仓逻辑结束 =====
 
         # 检测上拐点（做多信号）
-        if ((current_price >= window_high or price_breakout) and 
-            volume_surge and
-            self._check_min_interval(current_time)):
+        if signal == 2 and self._check_min_interval(bar_time):
             # 如果当前有空仓，先平空再开多
             if short_position > 0:
-                print(f"{self.instrument}: 检测到上拐点信号，先平空仓再开多仓！")
+                logger.info("%s: 检测到上拐点信号，先平空仓再开多仓！", instrument)
                 close_short_proto = Order(
-                    instrument=self.instrument,
-                    exchange=self.exchange,
+                    instrument=instrument,
+                    exchange=exchange,
                     direction=2,  # 买
                     offset=4,     # 平今
                     price=current_price + 1,
@@ -193,35 +306,35 @@ class TrendFollow(Strategy):
                     stopPrice=0,
                     orderPriceType=1
                 )
-                self.place_with_retry(close_short_proto, direction=2)
-                time.sleep(1)
-            print(f"{self.instrument}: 检测到上拐点信号，开多仓！")
-            self.broker.relog()
+                await self.place_with_retry(close_short_proto, direction=2)
+                # 平仓后的等待与重新登录同时进行
+                await asyncio.gather(asyncio.sleep(1), asyncio.to_thread(broker.relog))
+            else:
+                await asyncio.to_thread(broker.relog)
+            logger.info("%s: 检测到上拐点信号，开多仓！", instrument)
             duo_enter_point = current_price + self.trade_offset
             open_long_proto = Order(
-                instrument=self.instrument,
-                exchange=self.exchange,
+                instrument=instrument,
+                exchange=exchange,
                 direction=2,
                 offset=1,
                 price=duo_enter_point,
-                volume=dynamic_volume,
+                volume=lots,
                 stopPrice=0,
                 orderPriceType=1
             )
-            self.place_with_retry(open_long_proto, direction=2)
-            self.last_signal_time = current_time
+            await self.place_with_retry(open_long_proto, direction=2)
+            self._mark_signal(bar_time)
             self.last_entry_price = current_price
 
         # 检测下拐点（做空信号）
-        elif ((current_price <= window_low or current_price < window_low * 1.001) and 
-              volume_surge and
-              self._check_min_interval(current_time)):
+        elif signal == 3 and self._check_min_interval(bar_time):
             # 如果当前有多仓，先平多再开空
             if long_position > 0:
-                print(f"{self.instrument}: 检测到下拐点信号，先平多仓再开空仓！")
+                logger.info("%s: 检测到下拐点信号，先平多仓再开空仓！", instrument)
                 close_long_proto = Order(
-                    instrument=self.instrument,
-                    exchange=self.exchange,
+                    instrument=instrument,
+                    exchange=exchange,
                     direction=3,  # 卖
                     offset=4,     # 平今
                     price=current_price - 1,
@@ -229,56 +342,99 @@ class TrendFollow(Strategy):
                     stopPrice=0,
                     orderPriceType=1
                 )
-                self.place_with_retry(close_long_proto, direction=3)
-                time.sleep(1)
-            print(f"{self.instrument}: 检测到下拐点信号，开空仓！")
-            self.broker.relog()
+                await self.place_with_retry(close_long_proto, direction=3)
+                # 平仓后的等待与重新登录同时进行
+                await asyncio.gather(asyncio.sleep(1), asyncio.to_thread(broker.relog))
+            else:
+                await asyncio.to_thread(broker.relog)
+            logger.info("%s: 检测到下拐点信号，开空仓！", instrument)
             kong_enter_point = current_price - self.trade_offset
             open_short_proto = Order(
-                instrument=self.instrument,
-                exchange=self.exchange,
+                instrument=instrument,
+                exchange=exchange,
                 direction=3,
                 offset=1,
                 price=kong_enter_point,
-                volume=dynamic_volume,
+                volume=lots,
                 stopPrice=0,
                 orderPriceType=1
             )
-            self.place_with_retry(open_short_proto, direction=3)
-            self.last_signal_time = current_time
+            await self.place_with_retry(open_short_proto, direction=3)
+            self._mark_signal(bar_time)
             self.last_entry_price = current_price
         else:
-            print(f"{self.instrument}: 未检测到拐点信号")
+            logger.log(TRACE, "%s: 未检测到拐点信号", instrument)
 
         return new_orders
+
+    def backtest(self, data: pd.DataFrame):
+        """回测模式：对整段历史K线一次扫描出全部拐点信号，返回 [(信号K线时间, 开仓Order), ...]
+
+        拐点判断与generate_signal一致，只生成开仓信号，不模拟持仓、反手平仓与止盈止损
+        """
+        data = self.min_generate_features(data)
+        closes = data['Close'].to_numpy(dtype=np.float64)
+        highs = data['High'].to_numpy(dtype=np.float64)
+        lows = data['Low'].to_numpy(dtype=np.float64)
+        volumes = data['Volume'].to_numpy(dtype=np.float64)
+        times = data.index.values.astype('datetime64[s]').astype(np.int64)
+        window_volume_means = data['win_vol_mean'].to_numpy()
+
+        if NUMBA_AVAILABLE:
+            signal_idx, signal_dir = scan_pivots(
+                highs, lows, closes, volumes, times,
+                self.window_size, self.volume_threshold, self._min_interval_sec
+            )
+        else:
+            # 没有numba时逐根扫描是纯Python循环，改用已算好的窗口特征整列比较
+            signal_idx, signal_dir = scan_pivots_vectorized(
+                closes, volumes, times,
+                data['win_high'].to_numpy(), data['win_low'].to_numpy(), window_volume_means,
+                self.volume_threshold, self._min_interval_sec
+            )
+
+        # 信号强度法动态仓位，对全部信号K线整体截断到1~5手
+        signal_means = window_volume_means[signal_idx]
+        strength = np.divide(volumes[signal_idx], signal_means, out=np.ones_like(signal_means), where=signal_means > 0)
+        lots = np.clip((self.trade_num * strength).astype(np.int64), 1, 5)
+
+        signals = []
+        for i, direction, lot in zip(signal_idx, signal_dir, lots):
+            price = closes[i]
+            order = Order(
+                instrument=self.instrument,
+                exchange=self.exchange,
+                direction=int(direction),
+                offset=1,
+                price=price + self.trade_offset if direction == 2 else price - self.trade_offset,
+                volume=int(lot),
+                stopPrice=0,
+                orderPriceType=1
+            )
+            signals.append((data.index[i], order))
+        return signals
     
     def get_dynamic_volume(self, current_volume, window_volume_mean):
         """信号强度法动态仓位管理：成交量/均值，最少1手，最多5手"""
-        base_volume = self.trade_num  # 配置文件基础手数
-        strength = current_volume / window_volume_mean if window_volume_mean > 0 else 1
-        volume = int(base_volume * strength)
-        return max(1, min(volume, 5))  # 限定最大5手
+        return dynamic_volume(self.trade_num, float(current_volume), float(window_volume_mean))
 
-    def _check_min_interval(self, current_time) -> bool:
+    def _check_min_interval(self, bar_time) -> bool:
         """检查是否满足最小拐点间隔约束"""
         if self.last_signal_time is None:
             return True
-        
-        # 处理时间差计算
-        if hasattr(current_time, 'to_pydatetime'):
-            current_time = current_time.to_pydatetime()
-        if hasattr(self.last_signal_time, 'to_pydatetime'):
-            last_time = self.last_signal_time.to_pydatetime()
-        else:
-            last_time = self.last_signal_time
-            
-        if isinstance(current_time, datetime) and isinstance(last_time, datetime):
-            time_diff = (current_time - last_time).total_seconds() / 60
+
+        if isinstance(bar_time, datetime) and self._last_signal_epoch is not None:  # pd.Timestamp也是datetime
+            time_diff_seconds = bar_time.timestamp() - self._last_signal_epoch
         else:
             # 如果时间不是datetime对象，假设是索引位置，简单判断
-            time_diff = 10  # 默认满足间隔要求
-        
-        return time_diff >= self.min_interval
+            time_diff_seconds = 600  # 默认满足间隔要求（10分钟）
+
+        return time_diff_seconds >= self._min_interval_sec
+
+    def _mark_signal(self, bar_time):
+        """记录本次信号时间，同时换算好秒级时间戳"""
+        self.last_signal_time = bar_time
+        self._last_signal_epoch = bar_time.timestamp() if isinstance(bar_time, datetime) else None
 
     def write_order(self, type, point):  # 记录下单结果函数，非必需
         now = datetime.now().strftime("%m-%d %H:%M:%S")
@@ -293,30 +449,17 @@ class TrendFollow(Strategy):
         else:
             raise ValueError("Invalid type")
 
-        with self.lock:
-            with open("result/order_book.txt", "a", encoding="utf-8") as f:
-                f.write(line) 
+        _order_queue.put(line)
 
-    def place_with_retry(self, order_proto, direction, max_retry=3, wait_time=30):
-        """下单并自动撤单追价重挂，order_proto为Order对象模板，direction=2买/3卖"""
-        price = order_proto.price
+    async def place_with_retry(self, order_proto, direction, max_retry=3, wait_time=30):
+        """下单并自动撤单追价重挂，order_proto为本次下单新建的Order对象，重挂时直接修改其价格，direction=2买/3卖"""
         for retry in range(max_retry):
-            order = Order(
-                instrument=order_proto.instrument,
-                exchange=order_proto.exchange,
-                direction=order_proto.direction,
-                offset=order_proto.offset,
-                price=price,
-                volume=order_proto.volume,
-                stopPrice=order_proto.stopPrice,
-                orderPriceType=order_proto.orderPriceType
-            )
-            order_id = self.broker.place_order(order)
-            self.write_order(type=order_proto.offset, point=price)
-            time.sleep(wait_time)
-            self.broker.cancel_order(order_id)
-            print(f"{self.instrument}: 撤单并追价重挂（第{retry+1}次），当前价: {price}")
+            order_id = await asyncio.to_thread(self.broker.place_order, order_proto)
+            self.write_order(type=order_proto.offset, point=order_proto.price)
+            await asyncio.sleep(wait_time)  # 等待成交期间不占用事件循环，其他品种照常运行
+            await asyncio.to_thread(self.broker.cancel_order, order_id)
+            logger.info("%s: 撤单并追价重挂（第%d次），当前价: %s", self.instrument, retry + 1, order_proto.price)
             if direction == 2:
-                price += self.price_tick
+                order_proto.price += self.price_tick
             else:
-                price -= self.price_tick 
\ No newline at end of file
+                order_proto.price -= self.price_tick 
\ No newline at end of file